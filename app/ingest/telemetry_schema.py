@@ -13,7 +13,7 @@ Payload example (Case A):
 """
 
 import logging
-from typing import Any, Dict, Tuple
+from typing import Any, Callable, Dict, Tuple
 
 from ..storage.db import Database
 from ..hq.hq_model import compute_h_q
@@ -23,6 +23,39 @@ from ..qc.rules import qc_flags
 log = logging.getLogger(__name__)
 
 
+# Validator "biên dịch" theo phiên bản schema: shape của mỗi ver cố định nên
+# sinh một hàm truy cập khoá thẳng (không duyệt phản chiếu) bằng exec ở lần
+# đầu gặp ver đó, rồi cache vào PARSERS; payload lệch shape hoặc ver lạ rơi
+# về đường phản chiếu bên dưới.
+def _build_parser_v2() -> Callable[[Dict[str, Any]], tuple]:
+    src = """
+def _validate_v2(data):
+    node_id = data['node_id']
+    ts = data['ts']
+    if not node_id or not ts:
+        raise ValueError('missing node_id or ts')
+    s = data.get('s') or {}
+    dist = s.get('dist_m')
+    rain = s.get('rain_bin')
+    batt = s.get('batt_v')
+    return (
+        str(node_id),
+        str(ts),
+        float(dist) if dist is not None else None,
+        int(rain) if rain is not None else None,
+        float(batt) if batt is not None else None,
+        data.get('meta') or {},
+    )
+"""
+    ns: Dict[str, Any] = {}
+    exec(compile(src, __name__, "exec"), ns)
+    return ns["_validate_v2"]
+
+
+_PARSER_BUILDERS: Dict[int, Callable[[], Callable]] = {2: _build_parser_v2}
+PARSERS: Dict[int, Callable[[Dict[str, Any]], tuple]] = {}
+
+
 def validate_payload(data: Dict[str, Any]) -> Tuple[str, str, float | None, int | None, float | None, dict]:
     """Validate minimal telemetry fields; returns tuple.
 
@@ -31,6 +64,20 @@ def validate_payload(data: Dict[str, Any]) -> Tuple[str, str, float | None, int
     """
     if not isinstance(data, dict):
         raise ValueError("payload must be object")
+    ver = data.get("ver")
+    parser = PARSERS.get(ver)
+    if parser is None and (build := _PARSER_BUILDERS.get(ver)):
+        parser = PARSERS[ver] = build()
+    if parser is not None:
+        try:
+            return parser(data)
+        except KeyError:
+            # thiếu khoá bắt buộc: để đường phản chiếu báo lỗi như trước
+            pass
+    return _validate_reflective(data)
+
+
+def _validate_reflective(data: Dict[str, Any]) -> Tuple[str, str, float | None, int | None, float | None, dict]:
     node_id = str(data.get("node_id")) if data.get("node_id") else None
     ts = data.get("ts")
     s = data.get("s") or {}
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+"""Hot-path numeric kernels, JIT-compiled with numba when available.
+
+numba is optional (same pattern as pyqtgraph/QtWebEngine elsewhere):
+without it the plain-Python implementations below still run under
+NumPy, just without the nopython speedup.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit  # type: ignore
+except Exception:  # pragma: no cover - optional dependency
+    njit = None
+
+
+def _horizon_kernel_impl(hourly, horizons, W, b):
+    """Fused per-horizon aggregation + logistic probability + risk code.
+
+    hourly: float64[:] sanitized hourly precip (no NaN/None)
+    horizons: int64[:] window lengths in hours, sorted ascending
+    W: float64[:, :] logistic weights per horizon, features (total, max, prob)
+    b: float64[:] intercepts per horizon
+
+    Returns (totals, maxes, probs, risks) where risks holds
+    0=LOW, 1=MOD, 2=HIGH.
+    """
+    n_h = horizons.shape[0]
+    totals = np.zeros(n_h, dtype=np.float64)
+    maxes = np.zeros(n_h, dtype=np.float64)
+    probs = np.zeros(n_h, dtype=np.float64)
+    risks = np.zeros(n_h, dtype=np.int64)
+    # single pass: cumsum + running max, reading out at each horizon end
+    cum = 0.0
+    runmax = 0.0
+    j = 0
+    for i in range(hourly.shape[0]):
+        v = hourly[i]
+        cum += v
+        if v > runmax:
+            runmax = v
+        while j < n_h and horizons[j] == i + 1:
+            totals[j] = cum
+            maxes[j] = runmax
+            j += 1
+    while j < n_h:  # horizons longer than the series use the full window
+        totals[j] = cum
+        maxes[j] = runmax
+        j += 1
+    for k in range(n_h):
+        # third feature (mean prob) is unknown -> imputed to 0.0, same as
+        # HorizonModels.predict_proba does for a single NaN row
+        z = b[k] + W[k, 0] * totals[k] + W[k, 1] * maxes[k]
+        p = 1.0 / (1.0 + np.exp(-z))
+        probs[k] = p
+        risks[k] = 0 if p < 0.3 else (1 if p < 0.6 else 2)
+    return totals, maxes, probs, risks
+
+
+def _horizon_kernel_np(hourly, horizons, W, b):
+    """Vectorized equivalent of _horizon_kernel_impl: one cumsum/accumulate
+    plus a single stacked sigmoid instead of a Python loop per horizon."""
+    n_h = horizons.shape[0]
+    if hourly.shape[0] == 0:
+        totals = np.zeros(n_h, dtype=np.float64)
+        maxes = np.zeros(n_h, dtype=np.float64)
+    else:
+        cum = np.cumsum(hourly)
+        runmax = np.maximum.accumulate(hourly)
+        idx = np.minimum(horizons - 1, hourly.shape[0] - 1)
+        totals = cum[idx]
+        maxes = runmax[idx]
+    # features per horizon: (total, max, prob-imputed-to-0)
+    X = np.column_stack([totals, maxes, np.zeros(n_h, dtype=np.float64)])
+    probs = 1.0 / (1.0 + np.exp(-(np.einsum("hf,hf->h", X, W) + b)))
+    risks = np.where(probs < 0.3, 0, np.where(probs < 0.6, 1, 2)).astype(np.int64)
+    return totals, maxes, probs, risks
+
+
+def _clamp_f64_impl(v, lo, hi):
+    """Branch-only scalar clamp for tight numeric loops."""
+    return lo if v < lo else (hi if v > hi else v)
+
+
+def _median_std_nan_impl(a):
+    """NaN-aware median + population std of a float64 array in one pass.
+
+    Returns (median, std, count) over the non-NaN values; median and std
+    are NaN when everything is NaN (count 0), and std is 0.0 for a single
+    value. Std uses Welford's update so the compaction pass also feeds it.
+    """
+    n = a.shape[0]
+    buf = np.empty(n, dtype=np.float64)
+    m = 0
+    mean = 0.0
+    m2 = 0.0
+    for i in range(n):
+        v = a[i]
+        if v == v:  # NaN check without math.isnan
+            buf[m] = v
+            m += 1
+            delta = v - mean
+            mean += delta / m
+            m2 += delta * (v - mean)
+    if m == 0:
+        return np.nan, np.nan, 0
+    med = np.median(buf[:m])
+    std = np.sqrt(m2 / m) if m > 1 else 0.0
+    return med, std, m
+
+
+def _median_std_nan_np(a):
+    """Vectorized fallback for _median_std_nan_impl.
+
+    Uses the NaN-aware reductions directly instead of materializing a
+    masked copy; the count check first keeps np.nanmedian from warning on
+    an all-NaN input.
+    """
+    m = a.shape[0] - int(np.count_nonzero(np.isnan(a)))
+    if m == 0:
+        return np.nan, np.nan, 0
+    med = float(np.nanmedian(a))
+    if m < 2:
+        return med, 0.0, m
+    return med, float(np.nanstd(a, ddof=0)), m
+
+
+if njit is not None:
+    horizon_kernel = njit(cache=True)(_horizon_kernel_impl)
+    median_std_nan = njit(cache=True)(_median_std_nan_impl)
+    clamp_f64 = njit(cache=True, inline="always")(_clamp_f64_impl)
+else:
+    horizon_kernel = _horizon_kernel_np
+    median_std_nan = _median_std_nan_np
+    clamp_f64 = _clamp_f64_impl
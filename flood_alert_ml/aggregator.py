@@ -12,23 +12,29 @@ from .utils import median_safe, std_safe
 class WeatherAggregator:
     def __init__(self, fetchers: List["BaseFetcher"]):
         self.fetchers = fetchers
+        # persistent executor: sources fetch concurrently and the worker
+        # threads are reused across update rounds instead of being spawned
+        # and joined every tick
+        self._executor = ThreadPoolExecutor(max_workers=len(fetchers) or 1, thread_name_prefix="fetch")
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
 
     def fetch_all_parallel(self, lat: float, lon: float, tz: str) -> List[Dict[str, Any]]:
         rows: List[Dict[str, Any]] = []
-        with ThreadPoolExecutor(max_workers=len(self.fetchers) or 1, thread_name_prefix="fetch") as ex:
-            futs = [ex.submit(f.fetch, lat, lon, tz) for f in self.fetchers]
-            for fu in as_completed(futs):
-                try:
-                    rows.append(fu.result())
-                except Exception as e:
-                    rows.append({
-                        "timestamp": None,
-                        "precip_mm_h": None,
-                        "precip_prob": None,
-                        "source": "unknown",
-                        "series": [],
-                        "meta": {"error": str(e)},
-                    })
+        futs = [self._executor.submit(f.fetch, lat, lon, tz) for f in self.fetchers]
+        for fu in as_completed(futs):
+            try:
+                rows.append(fu.result())
+            except Exception as e:
+                rows.append({
+                    "timestamp": None,
+                    "precip_mm_h": None,
+                    "precip_prob": None,
+                    "source": "unknown",
+                    "series": [],
+                    "meta": {"error": str(e)},
+                })
         return rows
 
     def aggregate(self, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
@@ -6,11 +6,12 @@ from typing import List, Dict, Optional
 import numpy as np
 
 
-def compute_trend_mm_h(history: "deque[float]", k: int = 3) -> float:
-    arr = list(history)[-k:]
-    if len(arr) < 2:
+def compute_trend_mm_h(history, k: int = 3) -> float:
+    # accepts deque/list or an ndarray view of the ring buffer
+    arr = np.asarray(history, dtype=float)[-k:]
+    if arr.size < 2:
         return 0.0
-    return float(arr[-1] - arr[0]) / max(1, len(arr) - 1)
+    return float(arr[-1] - arr[0]) / max(1, arr.size - 1)
 
 
 def build_horizon_windows(hourly: list[float], hours: int) -> dict:
@@ -3,8 +3,6 @@ from __future__ import annotations
 import csv
 from typing import Dict, Any
 
-from openpyxl import Workbook, load_workbook
-
 from .config import CSV_LOG_PATH, XLSX_LOG_PATH, LOG_COLUMNS
 from .utils import atomic_write
 
@@ -25,6 +23,9 @@ class CSVLogger:
 
 class ExcelLogger:
     def append(self, row: Dict[str, Any]) -> None:
+        # openpyxl is heavy; only import it once a row is actually written
+        from openpyxl import Workbook, load_workbook
+
         if XLSX_LOG_PATH.exists():
             wb = load_workbook(XLSX_LOG_PATH)
             ws = wb.active
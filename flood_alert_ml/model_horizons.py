@@ -10,12 +10,28 @@ class HorizonModels:
     def __init__(self, thresholds: Dict[int, float]):
         self.thresholds = thresholds
         self.models: Dict[int, LogisticRegression] = {}
+        self._coef_cache: Dict[tuple, tuple] = {}
         self._train_all()
 
     def update_threshold(self, horizon: int, value: float) -> None:
         self.thresholds[horizon] = float(value)
         self._train(horizon)
 
+    def coef_matrix(self, horizons) -> tuple:
+        """Stacked logistic weights W (H, F) and intercepts b (H,) for the
+        given horizon order; cached until a model is retrained."""
+        key = tuple(horizons)
+        cached = self._coef_cache.get(key)
+        if cached is not None:
+            return cached
+        for h in key:
+            if h not in self.models:
+                self._train(h)
+        W = np.vstack([self.models[h].coef_[0] for h in key])
+        b = np.array([self.models[h].intercept_[0] for h in key])
+        self._coef_cache[key] = (W, b)
+        return W, b
+
     def _train_all(self) -> None:
         for h, thr in self.thresholds.items():
             self._train(h)
@@ -36,6 +52,7 @@ class HorizonModels:
         clf = LogisticRegression(class_weight="balanced", max_iter=200)
         clf.fit(X, y)
         self.models[horizon] = clf
+        self._coef_cache.clear()
 
     def predict_proba(self, horizon: int, X: np.ndarray) -> float:
         if horizon not in self.models:
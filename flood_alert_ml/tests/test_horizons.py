@@ -0,0 +1,27 @@
+import numpy as np
+
+from flood_alert_ml._nb import horizon_kernel
+from flood_alert_ml.features import make_feature_vector_h
+from flood_alert_ml.model_horizons import HorizonModels
+
+
+HORIZONS = [3, 6, 9, 12, 24]
+
+
+def test_kernel_matches_per_horizon_loop():
+    hm = HorizonModels({h: 50.0 + 10 * h for h in HORIZONS})
+    hourly = [float(x % 7) for x in range(24)]
+    W, b = hm.coef_matrix(HORIZONS)
+    totals, maxes, probs, risks = horizon_kernel(
+        np.asarray(hourly, dtype=np.float64),
+        np.asarray(HORIZONS, dtype=np.int64),
+        W,
+        b,
+    )
+    for i, h in enumerate(HORIZONS):
+        w = hourly[:h]
+        assert totals[i] == sum(w)
+        assert maxes[i] == max(w)
+        ph = hm.predict_proba(h, make_feature_vector_h(sum(w), max(w), None))
+        assert abs(probs[i] - ph) < 1e-9
+        assert risks[i] in (0, 1, 2)
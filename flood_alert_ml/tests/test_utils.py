@@ -0,0 +1,29 @@
+import math
+
+import numpy as np
+
+from flood_alert_ml.utils import median_safe, median_safe_batch, std_safe
+
+
+def test_median_safe_filters_none_and_nan():
+    assert median_safe([1.0, None, 3.0, math.nan, 2.0]) == 2.0
+    assert median_safe([]) is None
+    assert median_safe([None, math.nan]) is None
+
+
+def test_median_safe_batch_rows():
+    arr = np.array([
+        [1.0, 2.0, 3.0],
+        [math.nan, 4.0, 6.0],
+        [math.nan, math.nan, math.nan],
+    ])
+    out = median_safe_batch(arr)
+    assert out[0] == 2.0 and out[1] == 5.0 and math.isnan(out[2])
+
+
+def test_std_safe_matches_numpy():
+    vals = [1.0, 2.0, None, 4.0, math.nan]
+    clean = [1.0, 2.0, 4.0]
+    assert std_safe(vals) == float(np.std(clean))
+    assert std_safe([5.0]) == 0.0
+    assert std_safe([]) == 0.0
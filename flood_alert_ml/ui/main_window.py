@@ -1,12 +1,21 @@
 from __future__ import annotations
 
-from collections import deque
+import csv
+import functools
+import os
+import platform
+import sys
+import time
 from datetime import datetime, timezone
+from importlib import metadata
+from itertools import islice
+from pathlib import Path
 from typing import Any, Dict, List, Optional
 
 import numpy as np
-from PyQt6.QtCore import Qt, QTimer, pyqtSignal, QUrl
-from PyQt6.QtGui import QAction, QDesktopServices
+from PyQt6.QtCore import Qt, QTimer, pyqtSignal, QUrl, QSignalBlocker
+from PyQt6.QtCore import QLocale
+from PyQt6.QtGui import QAction, QDesktopServices, QDoubleValidator
 from PyQt6.QtWidgets import (
     QCheckBox,
     QComboBox,
@@ -37,10 +46,11 @@ from PyQt6.QtWidgets import (
     QHeaderView,
 )
 
+from .._nb import horizon_kernel
 from ..aggregator import WeatherAggregator
 from ..config import Preferences, HORIZONS, LOG_DIR, CSV_LOG_PATH, XLSX_LOG_PATH, save_preferences, load_preferences
 from ..env import get_openweather_key, save_openweather_key
-from ..features import compute_trend_mm_h, make_feature_vector, make_feature_vector_h
+from ..features import compute_trend_mm_h, make_feature_vector
 from ..geocode import GeoCoder
 from ..geolocate import get_location
 from ..logging_io import CSVLogger, ExcelLogger
@@ -49,10 +59,68 @@ from ..model_horizons import HorizonModels
 from ..sources.open_meteo import OpenMeteoFetcher
 from ..sources.open_weather import OpenWeatherFetcher
 from ..sources.simulator import SimulatedFetcher
-from ..sources.firebase_station import FirebaseStationFetcher
 from ..utils import utc_now
 from .widgets import StatCard, Toast, ChartWidget
-from ..workers import ThreadPool
+from ..workers import ThreadPool, format_error
+
+# ngưỡng phân loại rủi ro dùng chung cho xác suất tức thời và theo chân trời
+_RISK_THRESH = np.array([0.3, 0.6])
+_RISK_LABELS = ("LOW", "MOD", "HIGH")
+
+
+def _risk_label(p: float) -> str:
+    return _RISK_LABELS[int(np.searchsorted(_RISK_THRESH, p, side="right"))]
+
+
+@functools.lru_cache(maxsize=None)
+def _pkg_version(pkg: str) -> str:
+    # metadata.version quét sys.path + đọc METADATA; cache cho các lần mở sau
+    try:
+        return metadata.version(pkg)
+    except Exception:
+        return "-"
+
+
+@functools.lru_cache(maxsize=None)
+def _platform_info() -> str:
+    return platform.platform()
+
+
+# Định dạng trường cho dialog chi tiết nguồn: dựng một lần ở mức module,
+# mỗi lần mở dialog chỉ tra cứu + append
+def _fmt_float(v, nd=1):
+    try:
+        return f"{float(v):.{nd}f}"
+    except Exception:
+        return str(v)
+
+
+def _fmt_bool(v):
+    return "Bật" if bool(v) else "Tắt"
+
+
+def _fmt_prob_pct(v):
+    # precip_prob là 0..1; hiển thị theo %
+    return _fmt_float((float(v) * 100.0) if v is not None else 0.0, 0)
+
+
+# bố cục lưới ngưỡng dự báo: (chân trời, nhãn, hàng, cột) tính sẵn một lần
+_HORIZON_GRID_CELLS = [(h, f"{h} giờ", i // 3, (i % 3) * 2) for i, h in enumerate(HORIZONS)]
+
+_SOURCE_FIELDS = (
+    ("precip_mm_h", "Cường độ mưa (mm/h)", _fmt_float),
+    ("precip_prob", "Xác suất mưa (%)", _fmt_prob_pct),
+    ("flow_lpm", "Lưu lượng (L/phút)", _fmt_float),
+    ("float_active", "Phao", _fmt_bool),
+    ("temperature", "Nhiệt độ (°C)", _fmt_float),
+    ("humidity", "Độ ẩm (%)", _fmt_float),
+)
+
+_META_FIELDS = (
+    ("http_status", "Mã HTTP", str),
+    ("latency_ms", "Độ trễ", lambda v: f"{_fmt_float(v, 0)} ms"),
+    ("error", "Lỗi", str),
+)
 
 
 class MainWindow(QMainWindow):
@@ -75,8 +143,14 @@ class MainWindow(QMainWindow):
             self.fetchers.append(OpenWeatherFetcher())
         if self.prefs.enable_simulator:
             self.fetchers.append(SimulatedFetcher())
+        # tên nguồn trạm biết trước lúc khởi tạo -> tra cứu O(1) trong on_done
+        self._station_keys = []
         if getattr(self.prefs, "enable_firebase_station", False):
-            self.fetchers.append(FirebaseStationFetcher(station_id="station_A"))
+            # import trễ: firebase_admin chỉ được nạp khi trạm được bật
+            from ..sources.firebase_station import FirebaseStationFetcher
+            st = FirebaseStationFetcher(station_id="station_A")
+            self.fetchers.append(st)
+            self._station_keys.append(st.source)
         self.aggregator = WeatherAggregator(self.fetchers)
         self.model = FloodRiskModel(threshold_mm=self.prefs.threshold_mm_h)
         self.h_models = HorizonModels({h: float(self.prefs.thresholds_h[str(h)]) for h in HORIZONS})
@@ -85,12 +159,22 @@ class MainWindow(QMainWindow):
         self._pending_signals = []
 
         # State
-        self.history = deque(maxlen=12)
+        # ring buffer cố định cho lịch sử mưa tổng hợp (12 điểm gần nhất)
+        self._hist = np.zeros(12, dtype=np.float64)
+        self._hist_idx = 0
+        self._hist_n = 0
         # Use seconds-based interval; fall back to minutes if missing
         self.countdown_s = int(getattr(self.prefs, "interval_s", 30))
         self.running = True
         self._in_flight = False
         self._last_rows = []
+        # toạ độ đã parse sẵn: các điểm nóng đọc float thay vì float(QLineEdit.text())
+        self._lat = float(self.prefs.latitude)
+        self._lon = float(self.prefs.longitude)
+        self._last_header = ""
+        # cache (text, style) theo nhãn để bỏ qua setText/setStyleSheet thừa
+        self._src_last: Dict[QLabel, tuple] = {}
+        self._verdict_last: Optional[tuple] = None
 
         # UI
         root = QWidget()
@@ -113,6 +197,14 @@ class MainWindow(QMainWindow):
         self.prog_prob.setRange(0, 100)
         self.prog_prob.setFormat("Xác suất mô hình: %p%")
         self.prog_prob.setToolTip("Xác suất ngập do mô hình Logistic; màu sắc thay đổi theo mức rủi ro")
+        # màu chunk chọn bằng dynamic property: QSS chỉ parse một lần ở đây,
+        # mỗi lần đổi mức rủi ro chỉ cần setProperty + repolish
+        self.prog_prob.setProperty("risk", "LOW")
+        self.prog_prob.setStyleSheet(
+            'QProgressBar[risk="LOW"]::chunk { background-color: #2e7d32; }\n'
+            'QProgressBar[risk="MOD"]::chunk { background-color: #ef6c00; }\n'
+            'QProgressBar[risk="HIGH"]::chunk { background-color: #c62828; }'
+        )
         left.addWidget(self.prog_prob)
 
         # Khối chỉ số đơn giản, thân thiện
@@ -189,6 +281,8 @@ class MainWindow(QMainWindow):
             w.setWordWrap(True)
             dg.addWidget(w, r, c + 1)
             self.detail_labels[name] = w
+            # truy cập trực tiếp theo thuộc tính, khỏi tra dict trong on_done
+            setattr(self, f"_d_{name}", w)
         items = [
             ("agg_precip", "Mưa tổng hợp tức thời (mm/h)"),
             ("trend", "Xu hướng 3 điểm (mm/h)"),
@@ -248,10 +342,33 @@ class MainWindow(QMainWindow):
         self.chart = ChartWidget(); chart_layout.addWidget(self.chart)
         # Thứ tự tab ưu tiên sử dụng: Lịch sử, Files, Cài đặt, Thông tin
         self.tabs.addTab(self.chart_tab, "Lịch sử")
-        self.tabs.addTab(self._build_files_tab(), "Files")
-        self.tabs.addTab(self._build_settings_tab(), "Cài đặt")
-        self.tabs.addTab(self._build_info_tab(), "Thông tin")
+        # các tab ít dùng được dựng trễ ở lần mở đầu tiên (placeholder rỗng
+        # cho tới khi currentChanged chọn tới)
+        self._tab_builders: Dict[int, Any] = {}
+        for title, builder in (
+            ("Files", self._build_files_tab),
+            ("Cài đặt", self._build_settings_tab),
+            ("Thông tin", self._build_info_tab),
+        ):
+            idx = self.tabs.addTab(QWidget(), title)
+            self._tab_builders[idx] = builder
+        self.tabs.currentChanged.connect(self._ensure_tab)
         layout.addWidget(self.tabs)
+        # shadow chuỗi hiển thị: _snapshot_text ghép từ đây, khỏi gọi .text()
+        self._shadow: Dict[str, str] = {}
+        self._lbl_shadow_key: Dict[QLabel, str] = {}
+        for key, lbl in (
+            ("verdict", self.lbl_verdict),
+            ("consensus", self.lbl_consensus),
+            ("trend", self.lbl_trend),
+            ("src_om", self.lbl_src_om),
+            ("src_ow", self.lbl_src_ow),
+            ("src_sim", self.lbl_src_sim),
+            ("src_station", self.lbl_src_station),
+        ):
+            self._shadow[key] = lbl.text()
+            self._lbl_shadow_key[lbl] = key
+
         # apply initial view mode visibility
         self._apply_view_mode()
         self._apply_visibility()
@@ -261,6 +378,8 @@ class MainWindow(QMainWindow):
 
         # Timer
         self.timer = QTimer(self)
+        # độ chính xác giây là đủ; coarse timer giúp gộp wake-up của hệ thống
+        self.timer.setTimerType(Qt.TimerType.CoarseTimer)
         self.timer.timeout.connect(self._on_tick)
         self.timer.start(1000)
 
@@ -277,6 +396,12 @@ class MainWindow(QMainWindow):
         g.addWidget(QLabel("Kinh độ"), 0, 2)
         self.lon = QLineEdit(str(self.prefs.longitude))
         g.addWidget(self.lon, 0, 3)
+        # chặn giá trị không hợp lệ và chỉ parse một lần khi sửa xong
+        for edit, lo, hi in ((self.lat, -90.0, 90.0), (self.lon, -180.0, 180.0)):
+            vd = QDoubleValidator(lo, hi, 6, edit)
+            vd.setLocale(QLocale.c())
+            edit.setValidator(vd)
+            edit.editingFinished.connect(self._on_coords_edited)
 
         g.addWidget(QLabel("Chu kỳ (giây)"), 1, 0)
         self.interval = QSpinBox()
@@ -311,16 +436,28 @@ class MainWindow(QMainWindow):
     def show_toast(self, text: str):
         Toast(self, text).show()
 
+    def _set_text(self, key: str, lbl: QLabel, text: str) -> None:
+        # cập nhật widget và bản shadow dùng cho snapshot
+        self._shadow[key] = text
+        lbl.setText(text)
+
     def _on_tick(self):
         if self.running:
             self.countdown_s -= 1
             if self.countdown_s <= 0:
                 self.update_now()
+        # khi cửa sổ thu nhỏ/ẩn thì không ai thấy header, bỏ qua phần vẽ
+        if self.isMinimized() or not self.isVisible():
+            return
         mm = self.countdown_s // 60
         ss = self.countdown_s % 60
-        self.header.setText(
-            f"Khu vực: {self._area_label()} | Lần cập nhật: {datetime.now().strftime('%H:%M:%S')} | Còn lại: {mm:02d}:{ss:02d}"
+        text = (
+            f"Khu vực: {self._area_label()} | Lần cập nhật: {time.strftime('%H:%M:%S')} | Còn lại: {mm:02d}:{ss:02d}"
         )
+        # chỉ setText khi chuỗi thật sự thay đổi
+        if text != self._last_header:
+            self._last_header = text
+            self.header.setText(text)
 
     def start(self):
         self.running = True
@@ -346,6 +483,9 @@ class MainWindow(QMainWindow):
             if lat and lon:
                 self.lat.setText(f"{lat:.6f}")
                 self.lon.setText(f"{lon:.6f}")
+                # setText không phát editingFinished -> cập nhật cache trực tiếp
+                self._lat = float(lat)
+                self._lon = float(lon)
                 self.show_toast(f"Vị trí: {src.upper()}")
                 self.lbl_address.setText(f"Địa chỉ: {self._area_label()}")
             else:
@@ -363,13 +503,21 @@ class MainWindow(QMainWindow):
         except Exception:
             pass
 
-    def _area_label(self) -> str:
+    def _on_coords_edited(self):
         try:
-            lat = float(self.lat.text())
-            lon = float(self.lon.text())
+            self._lat = float(self.lat.text())
+            self._lon = float(self.lon.text())
         except Exception:
-            return "Xã Phước Long, tỉnh Cà Mau"
-        lbl = self.geocoder.reverse(lat, lon)
+            pass
+
+    def _history_view(self) -> np.ndarray:
+        # lịch sử theo thứ tự thời gian (cũ -> mới) từ ring buffer
+        if self._hist_n < self._hist.size:
+            return self._hist[: self._hist_n]
+        return np.roll(self._hist, -(self._hist_idx % self._hist.size))
+
+    def _area_label(self) -> str:
+        lbl = self.geocoder.reverse(self._lat, self._lon)
         return lbl if lbl and lbl != "-" else "Xã Phước Long, tỉnh Cà Mau"
 
     def update_now(self):
@@ -381,16 +529,18 @@ class MainWindow(QMainWindow):
     # use persistent thread pool
 
         def pipeline():
-            lat = float(self.lat.text())
-            lon = float(self.lon.text())
+            lat = self._lat
+            lon = self._lon
             tz = self.prefs.tz
             rows = self.aggregator.fetch_all_parallel(lat, lon, tz)
             ag = self.aggregator.aggregate(rows)
-            self.history.append(ag["aggregated_precip_mm_h"])
-            trend = compute_trend_mm_h(self.history, 3)
+            self._hist[self._hist_idx % self._hist.size] = ag["aggregated_precip_mm_h"]
+            self._hist_idx += 1
+            self._hist_n = min(self._hist_n + 1, self._hist.size)
+            trend = compute_trend_mm_h(self._history_view(), 3)
             X = make_feature_vector(ag["aggregated_precip_mm_h"], trend, None)
             p = self.model.predict_proba(X)
-            risk = "LOW" if p < 0.3 else ("MOD" if p < 0.6 else "HIGH")
+            risk = _risk_label(p)
             # horizon features using simple medians across source series
             series_list = [r.get("series", []) for r in rows if r.get("series")]
             if series_list:
@@ -399,149 +549,151 @@ class MainWindow(QMainWindow):
                 hourly = [0.0] * 24
             # sanitize NaN/None to 0.0 for chart stability
             hourly = [0.0 if (x is None or (isinstance(x, float) and np.isnan(x))) else float(x) for x in hourly]
+            # một kernel hợp nhất: cumsum/runmax + sigmoid + phân loại rủi ro
+            W, b = self.h_models.coef_matrix(HORIZONS)
+            totals, maxes, probs, risk_codes = horizon_kernel(
+                np.asarray(hourly, dtype=np.float64),
+                np.asarray(HORIZONS, dtype=np.int64),
+                W,
+                b,
+            )
             horizon_out = {}
-            for h in HORIZONS:
-                w = hourly[:h]
-                total = float(np.nansum(w))
-                mx = float(np.nanmax(w)) if w else 0.0
-                Xh = make_feature_vector_h(total, mx, None)
-                ph = self.h_models.predict_proba(h, Xh)
-                rh = "LOW" if ph < 0.3 else ("MOD" if ph < 0.6 else "HIGH")
-                horizon_out[h] = {"total": total, "max": mx, "prob": ph, "risk": rh}
+            for i, h in enumerate(HORIZONS):
+                horizon_out[h] = {
+                    "total": float(totals[i]),
+                    "max": float(maxes[i]),
+                    "prob": float(probs[i]),
+                    "risk": _RISK_LABELS[int(risk_codes[i])],
+                }
             return {"rows": rows, "ag": ag, "trend": trend, "p": p, "risk": risk, "hourly": hourly, "h": horizon_out}
 
         def on_done(res: Dict[str, Any]):
-            ag = res["ag"]
-            rows = res.get("rows") or []
-            # cache last rows for detail popups
-            self._last_rows = rows
-
-            # Rule-based override using hardware station
-            hw_data = next((r for r in rows if str(r.get("source", "")).startswith("station_")), None)
-            p = float(res.get("p") or 0.0)
-            risk = str(res.get("risk") or "LOW")
-            override_note = ""
-            if hw_data:
-                float_active = bool(hw_data.get("float_active", False))
-                flow_val = hw_data.get("flow_lpm")
-                try:
-                    flow_lpm = float(flow_val if flow_val is not None else 0.0)
-                except Exception:
-                    flow_lpm = 0.0
-                if float_active:
-                    p = 1.0
-                    risk = "HIGH"
-                    override_note = " (CẢM BIẾN PHAO KÍCH HOẠT!)"
-                elif flow_lpm > 50.0:
-                    p = max(p, 0.85)
-                    risk = "HIGH"
-                    override_note = f" (LƯU LƯỢNG CAO: {flow_lpm} L/phút)"
-
-            # Update headline with possibly overridden values
-            self.cards.set_value(f"{ag['aggregated_precip_mm_h']:.1f} mm/h | Xác suất={p*100:.0f}%")
-            self.cards.badge.set_risk(risk)
-            # persist overridden values to result for logging + downstream UI
-            res["p"] = p
-            res["risk"] = risk
-            if override_note:
-                ag["notes"] = (ag.get("notes") or "") + override_note
-            self.bt_update.setEnabled(True)
-            self._append_logs(res)
-            self._in_flight = False
-            # cập nhật chỉ số chi tiết
-            self.lbl_consensus.setText(f"Đồng thuận: {ag['consensus_score']:.2f}")
-            self.lbl_trend.setText(f"Xu hướng (3 điểm): {res['trend']:.1f} mm/h")
-            self.lbl_address.setText(f"Địa chỉ: {self._area_label()}")
-            # bảng chi tiết
-            if hasattr(self, 'detail_labels'):
-                def setd(key, val):
-                    lbl = self.detail_labels.get(key)
-                    if lbl:
-                        lbl.setText(val)
-                setd('agg_precip', f"{ag['aggregated_precip_mm_h']:.1f}")
-                setd('trend', f"{res['trend']:.1f}")
-                setd('threshold', f"{float(self.threshold.value()):.1f}")
-                setd('prob', f"{res['p']*100:.0f}")
-                setd('risk', res['risk'])
-                setd('sources', str(ag.get('sources_available', 0)))
-                setd('consensus', f"{ag.get('consensus_score', 0.0):.2f}")
-                setd('degraded', "Có suy giảm" if ag.get('degraded') else "Bình thường")
-                setd('notes', ag.get('notes') or '-')
-                # per-source quick look from rows
-                rows = res.get('rows') or []
-                def get_src(name, field):
-                    for r in rows:
-                        if r.get('source') == name:
-                            return r.get(field)
-                    return None
-                om_p = get_src('open_meteo', 'precip_mm_h'); om_pb = get_src('open_meteo','precip_prob')
-                ow_p = get_src('openweather', 'precip_mm_h'); ow_pb = get_src('openweather','precip_prob')
-                sm_p = get_src('simulator', 'precip_mm_h')
-                setd('om_precip', f"{om_p:.1f}" if om_p is not None else '-')
-                setd('om_prob', f"{(om_pb or 0)*100:.0f}" if om_pb is not None else '-')
-                setd('ow_precip', f"{ow_p:.1f}" if ow_p is not None else '-')
-                setd('ow_prob', f"{(ow_pb or 0)*100:.0f}" if ow_pb is not None else '-')
-                setd('sim_precip', f"{sm_p:.1f}" if sm_p is not None else '-')
-            # cập nhật grid đa chân trời
-            for h, hv in res["h"].items():
-                txt = f"Tổng={hv['total']:.1f} | Cực đại={hv['max']:.1f} | P={hv['prob']*100:.0f}%"
-                card = self.h_cards[h]
-                card.set_value(txt)
-                card.badge.set_risk(hv['risk'])
-            # cập nhật trạng thái theo nguồn
+            # Gom toàn bộ cập nhật widget vào một lần repaint duy nhất
+            root = self.centralWidget()
+            root.setUpdatesEnabled(False)
             try:
-                rows = res.get('rows') or []
+                ag = res["ag"]
+                rows = res.get("rows") or []
+                # cache last rows for detail popups
+                self._last_rows = rows
+                # index theo nguồn: thay các vòng quét tuyến tính bằng tra cứu dict
+                by_src = {str(r.get("source", "")): r for r in rows}
+
                 def get_src(name, field):
-                    for r in rows:
-                        if r.get('source') == name:
-                            return r.get(field)
-                    return None
+                    r = by_src.get(name)
+                    return r.get(field) if r else None
+
+                # Rule-based override using hardware station
+                hw_data = next((by_src[k] for k in self._station_keys if k in by_src), None)
+                p = float(res.get("p") or 0.0)
+                risk = str(res.get("risk") or "LOW")
+                override_note = ""
+                if hw_data:
+                    float_active = bool(hw_data.get("float_active", False))
+                    flow_val = hw_data.get("flow_lpm")
+                    try:
+                        flow_lpm = float(flow_val if flow_val is not None else 0.0)
+                    except Exception:
+                        flow_lpm = 0.0
+                    if float_active:
+                        p = 1.0
+                        risk = "HIGH"
+                        override_note = " (CẢM BIẾN PHAO KÍCH HOẠT!)"
+                    elif flow_lpm > 50.0:
+                        p = max(p, 0.85)
+                        risk = "HIGH"
+                        override_note = f" (LƯU LƯỢNG CAO: {flow_lpm} L/phút)"
+
+                # Update headline with possibly overridden values
+                self.cards.set_value(f"{ag['aggregated_precip_mm_h']:.1f} mm/h | Xác suất={p*100:.0f}%")
+                self.cards.badge.set_risk(risk)
+                # persist overridden values to result for logging + downstream UI
+                res["p"] = p
+                res["risk"] = risk
+                if override_note:
+                    ag["notes"] = (ag.get("notes") or "") + override_note
+                self.bt_update.setEnabled(True)
+                self._append_logs(res)
+                self._in_flight = False
+                # cập nhật chỉ số chi tiết
+                self._set_text('consensus', self.lbl_consensus, f"Đồng thuận: {ag['consensus_score']:.2f}")
+                self._set_text('trend', self.lbl_trend, f"Xu hướng (3 điểm): {res['trend']:.1f} mm/h")
+                self.lbl_address.setText(f"Địa chỉ: {self._area_label()}")
+                # bảng chi tiết (nhãn đã bind sẵn thành thuộc tính trong __init__)
+                self._d_agg_precip.setText(f"{ag['aggregated_precip_mm_h']:.1f}")
+                self._d_trend.setText(f"{res['trend']:.1f}")
+                self._d_threshold.setText(f"{float(self.threshold.value()):.1f}")
+                self._d_prob.setText(f"{res['p']*100:.0f}")
+                self._d_risk.setText(res['risk'])
+                self._d_sources.setText(str(ag.get('sources_available', 0)))
+                self._d_consensus.setText(f"{ag.get('consensus_score', 0.0):.2f}")
+                self._d_degraded.setText("Có suy giảm" if ag.get('degraded') else "Bình thường")
+                self._d_notes.setText(ag.get('notes') or '-')
+                # per-source quick look from rows
                 om_p = get_src('open_meteo', 'precip_mm_h'); om_pb = get_src('open_meteo','precip_prob')
                 ow_p = get_src('openweather', 'precip_mm_h'); ow_pb = get_src('openweather','precip_prob')
-                sm_p = get_src('simulator', 'precip_mm_h'); sm_pb = None
-                st_p = get_src('station_station_A', 'precip_mm_h')
-                st_float = get_src('station_station_A', 'float_active')
-                st_pb = 1.0 if st_float else (0.5 if (st_p or 0) > 0 else 0.0)
-                thr = float(self.threshold.value())
-                self._set_src_label(self.lbl_src_om, 'Open-Meteo', om_p, om_pb, thr)
-                self._set_src_label(self.lbl_src_ow, 'OpenWeather', ow_p, ow_pb, thr)
-                self._set_src_label(self.lbl_src_sim, 'Mô phỏng', sm_p, sm_pb, thr)
-                self._set_src_label(self.lbl_src_station, 'Trạm A', st_p, st_pb, thr)
-                # Diagnostic tooltips for errors
-                def get_meta_err(name: str):
-                    for r in rows:
-                        if r.get('source') == name:
-                            m = r.get('meta') or {}
-                            return m.get('error')
-                    return None
-                for lbl, src_name in [
-                    (self.lbl_src_om, 'open_meteo'),
-                    (self.lbl_src_ow, 'openweather'),
-                    (self.lbl_src_sim, 'simulator'),
-                    (self.lbl_src_station, 'station_station_A'),
-                ]:
-                    err = get_meta_err(src_name)
-                    if err:
-                        lbl.setToolTip(f"Lỗi nguồn: {err}")
-                    else:
-                        # keep existing tooltip text
-                        if not lbl.toolTip().startswith('Màu chấm'):
-                            lbl.setToolTip('Màu chấm biểu thị mức rủi ro ước tính của nguồn')
-            except Exception:
-                pass
-            # cập nhật kết luận thân thiện
-            self._update_verdict(res["risk"], res["p"])
-            # cập nhật biểu đồ
-            if hasattr(self, 'chart') and self.chart and res.get('hourly'):
-                # precip series is 'hourly'; probs approximate from per-horizon prob mapped across window ends
-                precip = res['hourly']
-                # build a simple per-hour probability line: repeat last horizon prob or derive from instant p
-                probs = [res['p']*100.0] * len(precip)
-                self.chart.update_series(precip, probs)
+                sm_p = get_src('simulator', 'precip_mm_h')
+                self._d_om_precip.setText(f"{om_p:.1f}" if om_p is not None else '-')
+                self._d_om_prob.setText(f"{(om_pb or 0)*100:.0f}" if om_pb is not None else '-')
+                self._d_ow_precip.setText(f"{ow_p:.1f}" if ow_p is not None else '-')
+                self._d_ow_prob.setText(f"{(ow_pb or 0)*100:.0f}" if ow_pb is not None else '-')
+                self._d_sim_precip.setText(f"{sm_p:.1f}" if sm_p is not None else '-')
+                # cập nhật grid đa chân trời
+                for h, hv in res["h"].items():
+                    txt = f"Tổng={hv['total']:.1f} | Cực đại={hv['max']:.1f} | P={hv['prob']*100:.0f}%"
+                    card = self.h_cards[h]
+                    card.set_value(txt)
+                    card.badge.set_risk(hv['risk'])
+                # cập nhật trạng thái theo nguồn
+                try:
+                    sm_pb = None
+                    st_p = get_src('station_station_A', 'precip_mm_h')
+                    st_float = get_src('station_station_A', 'float_active')
+                    st_pb = 1.0 if st_float else (0.5 if (st_p or 0) > 0 else 0.0)
+                    thr = float(self.threshold.value())
+                    self._set_src_label(self.lbl_src_om, 'Open-Meteo', om_p, om_pb, thr)
+                    self._set_src_label(self.lbl_src_ow, 'OpenWeather', ow_p, ow_pb, thr)
+                    self._set_src_label(self.lbl_src_sim, 'Mô phỏng', sm_p, sm_pb, thr)
+                    self._set_src_label(self.lbl_src_station, 'Trạm A', st_p, st_pb, thr)
+                    # Diagnostic tooltips for errors
+                    def get_meta_err(name: str):
+                        r = by_src.get(name)
+                        if r is None:
+                            return None
+                        m = r.get('meta') or {}
+                        return m.get('error')
+                    for lbl, src_name in [
+                        (self.lbl_src_om, 'open_meteo'),
+                        (self.lbl_src_ow, 'openweather'),
+                        (self.lbl_src_sim, 'simulator'),
+                        (self.lbl_src_station, 'station_station_A'),
+                    ]:
+                        err = get_meta_err(src_name)
+                        if err:
+                            lbl.setToolTip(f"Lỗi nguồn: {err}")
+                        else:
+                            # keep existing tooltip text
+                            if not lbl.toolTip().startswith('Màu chấm'):
+                                lbl.setToolTip('Màu chấm biểu thị mức rủi ro ước tính của nguồn')
+                except Exception:
+                    pass
+                # cập nhật kết luận thân thiện
+                self._update_verdict(res["risk"], res["p"])
+                # cập nhật biểu đồ
+                if hasattr(self, 'chart') and self.chart and res.get('hourly'):
+                    # precip series is 'hourly'; probs approximate from per-horizon prob mapped across window ends
+                    precip = res['hourly']
+                    # build a simple per-hour probability line: repeat last horizon prob or derive from instant p
+                    probs = [res['p']*100.0] * len(precip)
+                    self.chart.update_series(precip, probs)
+
+            finally:
+                root.setUpdatesEnabled(True)
+                root.update()
 
         self._in_flight = True
         sig = self.tp.submit(pipeline)
-        def on_err(msg: str):
+        def on_err(exc: BaseException):
             self.bt_update.setEnabled(True)
             self._in_flight = False
             try:
@@ -549,7 +701,7 @@ class MainWindow(QMainWindow):
             except Exception:
                 pass
             try:
-                self.show_toast(msg)
+                self.show_toast(format_error(exc))
             except Exception:
                 pass
         sig.success.connect(on_done)
@@ -564,8 +716,8 @@ class MainWindow(QMainWindow):
 
     def _append_logs(self, res: Dict[str, Any]):
         ag = res["ag"]
-        lat = float(self.lat.text())
-        lon = float(self.lon.text())
+        lat = self._lat
+        lon = self._lon
         area = self._area_label()
         rows = res["rows"]
         def get_src(name: str, field: str):
@@ -627,21 +779,34 @@ class MainWindow(QMainWindow):
         # Thông điệp đơn giản, dễ hiểu
         msg = "An toàn"
         color = "#2e7d32"  # green
+        key = "LOW"
         if risk_label.upper() == "HIGH":
             msg = "Rất dễ ngập"
             color = "#c62828"  # red
+            key = "HIGH"
         elif risk_label.upper().startswith("MOD"):
             msg = "Cần chú ý"
             color = "#ef6c00"  # orange
-        self.lbl_verdict.setText(f"Kết luận hiện tại: {msg} ({prob*100:.0f}%)")
+            key = "MOD"
+        pct = int(prob * 100)
+        if self._verdict_last == (msg, color, pct):
+            return
+        self._verdict_last = (msg, color, pct)
+        self._set_text('verdict', self.lbl_verdict, f"Kết luận hiện tại: {msg} ({pct}%)")
         self.lbl_verdict.setStyleSheet(f"font-weight:600; padding:6px; border-radius:6px; background:{color}20; color:{color};")
         # cập nhật thanh xác suất
-        self.prog_prob.setValue(int(prob * 100))
-        # tô màu trực quan
-        self.prog_prob.setStyleSheet(f"QProgressBar::chunk {{ background-color: {color}; }}")
+        self.prog_prob.setValue(pct)
+        # tô màu qua property đã khai báo trong QSS tĩnh, không re-parse CSS
+        if self.prog_prob.property("risk") != key:
+            self.prog_prob.setProperty("risk", key)
+            st = self.prog_prob.style()
+            st.unpolish(self.prog_prob)
+            st.polish(self.prog_prob)
 
     def resizeEvent(self, event):
         super().resizeEvent(event)
+        if self.isMinimized():
+            return
         self._rebuild_horizon_grid()
 
     def _rebuild_horizon_grid(self):
@@ -674,7 +839,7 @@ class MainWindow(QMainWindow):
     def _set_src_label(self, lbl: QLabel, name: str, precip: Optional[float], prob: Optional[float], threshold: float):
         txt_p = "-" if precip is None else f"{precip:.1f}"
         txt_pb = "-" if prob is None else f"{prob*100:.0f}%"
-        lbl.setText(f"● {name}: {txt_p} mm/h | P={txt_pb}")
+        text = f"● {name}: {txt_p} mm/h | P={txt_pb}"
         # ước lượng mức màu
         score = 0.0
         if prob is not None:
@@ -683,23 +848,33 @@ class MainWindow(QMainWindow):
             ratio = precip / threshold
             score = 1.0 if ratio >= 1.0 else (0.6 if ratio >= 0.6 else 0.2)
         color = "#2e7d32" if score < 0.3 else ("#ef6c00" if score < 0.6 else "#c62828")
-        lbl.setStyleSheet(f"color:{color}; font-weight:600")
+        style = f"color:{color}; font-weight:600"
+        # giá trị nguồn thường ổn định giữa các tick: bỏ qua khi không đổi
+        if self._src_last.get(lbl) == (text, style):
+            return
+        self._src_last[lbl] = (text, style)
+        self._shadow[self._lbl_shadow_key[lbl]] = text
+        lbl.setText(text)
+        lbl.setStyleSheet(style)
 
     def _snapshot_text(self) -> str:
-        lines = []
-        lines.append(f"Khu vực: {self._area_label()}")
-        lines.append(self.cards.value.text())
-        lines.append(self.lbl_verdict.text())
-        lines.append(self.lbl_consensus.text())
-        lines.append(self.lbl_trend.text())
-        # theo nguồn
-        lines.append(self.lbl_src_om.text())
-        lines.append(self.lbl_src_ow.text())
-        lines.append(self.lbl_src_sim.text())
-        lines.append(self.lbl_src_station.text())
+        # ghép từ shadow thuần Python, không gọi .text() qua biên PyQt
+        sh = self._shadow
+        lines = [
+            f"Khu vực: {self._area_label()}",
+            self.cards.value_text,
+            sh['verdict'],
+            sh['consensus'],
+            sh['trend'],
+            # theo nguồn
+            sh['src_om'],
+            sh['src_ow'],
+            sh['src_sim'],
+            sh['src_station'],
+        ]
         # đa chân trời
         for h, card in self.h_cards.items():
-            lines.append(f"{card.title.text()}: {card.value.text()} | {card.badge.text()}")
+            lines.append(f"{card.title_text}: {card.value_text} | {card.badge.risk_text}")
         return "\n".join(lines)
 
     def _show_source_details(self, src_name: str, title: str) -> None:
@@ -712,73 +887,64 @@ class MainWindow(QMainWindow):
         if not row:
             self.show_toast("Chưa có dữ liệu cho nguồn này. Hãy cập nhật trước.")
             return
-        # Helpers
-        def fmt_float(v, nd=1):
-            try:
-                return f"{float(v):.{nd}f}"
-            except Exception:
-                return str(v)
-        def fmt_bool(v):
-            return "Bật" if bool(v) else "Tắt"
-
         lines: List[str] = []
-        lines.append(f"Nguồn: {title}")
+        append = lines.append  # tra cứu method một lần cho cả phần dựng text
+        append(f"Nguồn: {title}")
         ts = row.get('timestamp') or utc_now()
-        lines.append(f"Thời gian: {ts}")
-
-        # Field mappings (VN labels)
-        # Note: precip_prob is 0..1; display as %
-        fields = [
-            ("precip_mm_h", "Cường độ mưa (mm/h)", lambda v: fmt_float(v, 1)),
-            ("precip_prob", "Xác suất mưa (%)", lambda v: fmt_float((float(v) * 100.0) if v is not None else 0.0, 0)),
-            ("flow_lpm", "Lưu lượng (L/phút)", lambda v: fmt_float(v, 1)),
-            ("float_active", "Phao", lambda v: fmt_bool(v)),
-            ("temperature", "Nhiệt độ (°C)", lambda v: fmt_float(v, 1)),
-            ("humidity", "Độ ẩm (%)", lambda v: fmt_float(v, 1)),
-        ]
-        for key, label, f in fields:
+        append(f"Thời gian: {ts}")
+
+        for key, label, f in _SOURCE_FIELDS:
             if key in row and row.get(key) is not None:
-                lines.append(f"{label}: {f(row.get(key))}")
+                append(f"{label}: {f(row.get(key))}")
 
         # Series length (if available)
         series = row.get('series')
         if isinstance(series, list):
-            lines.append(f"Chuỗi dữ liệu: {len(series)} điểm")
+            append(f"Chuỗi dữ liệu: {len(series)} điểm")
 
         # Meta details (VN labels)
         meta = row.get('meta') or {}
         if meta:
-            lines.append("\nThông tin kết nối:")
-            if meta.get('http_status') is not None:
-                lines.append(f"  Mã HTTP: {meta.get('http_status')}")
-            if meta.get('latency_ms') is not None:
-                lines.append(f"  Độ trễ: {fmt_float(meta.get('latency_ms'), 0)} ms")
-            if meta.get('error'):
-                lines.append(f"  Lỗi: {meta.get('error')}")
-
-        # Show dialog
-        dlg = QDialog(self)
+            append("\nThông tin kết nối:")
+            for key, label, f in _META_FIELDS:
+                v = meta.get(key)
+                if v is None or v == "":
+                    continue
+                append(f"  {label}: {f(v)}")
+
+        # Show dialog (dựng một lần, các lần sau chỉ đổi tiêu đề + nội dung)
+        dlg = getattr(self, '_details_dlg', None)
+        if dlg is None:
+            dlg = QDialog(self)
+            v = QVBoxLayout(dlg)
+            txt = QTextEdit(); txt.setReadOnly(True)
+            v.addWidget(txt)
+            btns = QHBoxLayout(); v.addLayout(btns)
+            btns.addStretch(1)
+            bt_close = QPushButton("Đóng")
+            bt_close.clicked.connect(dlg.close)
+            btns.addWidget(bt_close)
+            dlg.resize(520, 420)
+            self._details_dlg = dlg
+            self._details_txt = txt
         dlg.setWindowTitle(f"Chi tiết nguồn — {title}")
-        v = QVBoxLayout(dlg)
-        txt = QTextEdit(); txt.setReadOnly(True)
-        txt.setPlainText("\n".join(lines))
-        v.addWidget(txt)
-        btns = QHBoxLayout(); v.addLayout(btns)
-        btns.addStretch(1)
-        bt_close = QPushButton("Đóng")
-        def _close():
-            try:
-                dlg.close()
-            except Exception:
-                pass
-        bt_close.clicked.connect(_close)
-        btns.addWidget(bt_close)
-        dlg.resize(520, 420)
+        self._details_txt.setPlainText("\n".join(lines))
         dlg.exec()
 
     # =========================
     # Tabs: Settings / Info / Files
     # =========================
+    def _ensure_tab(self, index: int) -> None:
+        # dựng nội dung tab ở lần chọn đầu tiên rồi thay placeholder
+        builder = self._tab_builders.pop(index, None)
+        if builder is None:
+            return
+        title = self.tabs.tabText(index)
+        w = builder()
+        self.tabs.removeTab(index)
+        self.tabs.insertTab(index, w, title)
+        self.tabs.setCurrentIndex(index)
+
     def _build_settings_tab(self) -> QWidget:
         w = QWidget()
         form = QFormLayout(w)
@@ -870,13 +1036,15 @@ class MainWindow(QMainWindow):
         form.addRow("Ngưỡng tức thời (mm/h)", self.dsb_thresh)
 
         self.h_thresh = {}
+        # khoá str(h) tính sẵn một lần, dùng lại ở do_save/do_reload
+        self._h_thresh_keys = {h: str(h) for h in HORIZONS}
         grid = QGridLayout();
-        for i, h in enumerate(HORIZONS):
+        for h, label, r, c in _HORIZON_GRID_CELLS:
             dsb = QDoubleSpinBox(); dsb.setRange(0.0, 2000.0); dsb.setDecimals(1)
-            dsb.setValue(float(self.prefs.thresholds_h.get(str(h), 100.0)))
+            dsb.setValue(float(self.prefs.thresholds_h.get(self._h_thresh_keys[h], 100.0)))
             self.h_thresh[h] = dsb
-            grid.addWidget(QLabel(f"{h} giờ"), i // 3, (i % 3) * 2)
-            grid.addWidget(dsb, i // 3, (i % 3) * 2 + 1)
+            grid.addWidget(QLabel(label), r, c)
+            grid.addWidget(dsb, r, c + 1)
         box_thresh = QWidget(); box_thresh.setLayout(grid)
         form.addRow("Ngưỡng dự báo", box_thresh)
 
@@ -887,25 +1055,31 @@ class MainWindow(QMainWindow):
         form.addRow("", row_btn)
 
         def do_save():
-            # Update preferences and persist
-            self.prefs.enable_open_meteo = self.cb_om.isChecked()
-            self.prefs.enable_open_weather = self.cb_ow.isChecked()
-            self.prefs.enable_simulator = self.cb_sim.isChecked()
-            self.prefs.enable_firebase_station = self.cb_firebase.isChecked()
-            self.prefs.interval_s = int(self.sb_interval.value())
-            self.prefs.theme = self.cmb_theme.currentText()
-            self.prefs.font_scale = float(self.dsb_font.value())
-            self.prefs.detailed_view = bool(self.cb_detailed.isChecked())
-            self.prefs.anonymize_coords = self.cb_anon.isChecked()
-            self.prefs.dynamic_scheduling = self.cb_dynamic.isChecked()
-            self.prefs.tz = self.ed_tz.text().strip() or self.prefs.tz
-            self.prefs.threshold_mm_h = float(self.dsb_thresh.value())
-            self.prefs.show_prob_bar = self.cb_prob_bar.isChecked()
-            self.prefs.show_source_status = self.cb_src_status.isChecked()
-            self.prefs.show_detail_group = self.cb_detail_group.isChecked()
-            self.prefs.show_horizon_cards = self.cb_h_cards.isChecked()
+            # Update preferences and persist: gom một dict rồi setattr một lượt
+            updates = {
+                "enable_open_meteo": self.cb_om.isChecked(),
+                "enable_open_weather": self.cb_ow.isChecked(),
+                "enable_simulator": self.cb_sim.isChecked(),
+                "enable_firebase_station": self.cb_firebase.isChecked(),
+                "interval_s": int(self.sb_interval.value()),
+                "theme": self.cmb_theme.currentText(),
+                "font_scale": float(self.dsb_font.value()),
+                "detailed_view": bool(self.cb_detailed.isChecked()),
+                "anonymize_coords": self.cb_anon.isChecked(),
+                "dynamic_scheduling": self.cb_dynamic.isChecked(),
+                "tz": self.ed_tz.text().strip() or self.prefs.tz,
+                "threshold_mm_h": float(self.dsb_thresh.value()),
+                "show_prob_bar": self.cb_prob_bar.isChecked(),
+                "show_source_status": self.cb_src_status.isChecked(),
+                "show_detail_group": self.cb_detail_group.isChecked(),
+                "show_horizon_cards": self.cb_h_cards.isChecked(),
+            }
+            for k, v in updates.items():
+                setattr(self.prefs, k, v)
+            thr = self.prefs.thresholds_h
+            keys = self._h_thresh_keys
             for h, dsb in self.h_thresh.items():
-                self.prefs.thresholds_h[str(h)] = float(dsb.value())
+                thr[keys[h]] = float(dsb.value())
             save_preferences(self.prefs)
             # apply to runtime
             self.interval.setValue(int(getattr(self.prefs, "interval_s", 30)))
@@ -919,24 +1093,38 @@ class MainWindow(QMainWindow):
 
         def do_reload():
             p = load_preferences()
-            self.cb_om.setChecked(p.enable_open_meteo)
-            self.cb_ow.setChecked(p.enable_open_weather)
-            self.cb_sim.setChecked(p.enable_simulator)
-            self.cb_firebase.setChecked(getattr(p, "enable_firebase_station", False))
-            self.sb_interval.setValue(int(getattr(p, "interval_s", getattr(p, "interval_min", 1) * 60)))
-            self.cmb_theme.setCurrentText(p.theme)
-            self.dsb_font.setValue(float(p.font_scale or 1.0))
-            self.cb_detailed.setChecked(bool(p.detailed_view))
-            self.cb_prob_bar.setChecked(p.show_prob_bar)
-            self.cb_src_status.setChecked(p.show_source_status)
-            self.cb_detail_group.setChecked(p.show_detail_group)
-            self.cb_h_cards.setChecked(p.show_horizon_cards)
-            self.cb_anon.setChecked(p.anonymize_coords)
-            self.cb_dynamic.setChecked(p.dynamic_scheduling)
-            self.ed_tz.setText(p.tz)
-            self.dsb_thresh.setValue(float(p.threshold_mm_h))
-            for h, dsb in self.h_thresh.items():
-                dsb.setValue(float(p.thresholds_h.get(str(h), dsb.value())))
+            # chặn signal khi khôi phục hàng loạt: tránh mỗi setChecked/
+            # setValue kích hoạt lại slot giữa chừng
+            widgets = [
+                self.cb_om, self.cb_ow, self.cb_sim, self.cb_firebase,
+                self.sb_interval, self.cmb_theme, self.dsb_font,
+                self.cb_detailed, self.cb_prob_bar, self.cb_src_status,
+                self.cb_detail_group, self.cb_h_cards, self.cb_anon,
+                self.cb_dynamic, self.ed_tz, self.dsb_thresh,
+                *self.h_thresh.values(),
+            ]
+            blockers = [QSignalBlocker(wdg) for wdg in widgets]
+            try:
+                self.cb_om.setChecked(p.enable_open_meteo)
+                self.cb_ow.setChecked(p.enable_open_weather)
+                self.cb_sim.setChecked(p.enable_simulator)
+                self.cb_firebase.setChecked(getattr(p, "enable_firebase_station", False))
+                self.sb_interval.setValue(int(getattr(p, "interval_s", getattr(p, "interval_min", 1) * 60)))
+                self.cmb_theme.setCurrentText(p.theme)
+                self.dsb_font.setValue(float(p.font_scale or 1.0))
+                self.cb_detailed.setChecked(bool(p.detailed_view))
+                self.cb_prob_bar.setChecked(p.show_prob_bar)
+                self.cb_src_status.setChecked(p.show_source_status)
+                self.cb_detail_group.setChecked(p.show_detail_group)
+                self.cb_h_cards.setChecked(p.show_horizon_cards)
+                self.cb_anon.setChecked(p.anonymize_coords)
+                self.cb_dynamic.setChecked(p.dynamic_scheduling)
+                self.ed_tz.setText(p.tz)
+                self.dsb_thresh.setValue(float(p.threshold_mm_h))
+                for h, dsb in self.h_thresh.items():
+                    dsb.setValue(float(p.thresholds_h.get(self._h_thresh_keys[h], dsb.value())))
+            finally:
+                del blockers
             # also update prefs in memory and apply visibility
             self.prefs = p
             self._apply_view_mode()
@@ -956,10 +1144,7 @@ class MainWindow(QMainWindow):
             self._save_key()  # ensure saved first
             from ..workers import ThreadPool
             def task():
-                try:
-                    lat = float(self.lat.text()); lon = float(self.lon.text())
-                except Exception:
-                    lat, lon = 10.762622, 106.660172
+                lat, lon = self._lat, self._lon
                 try:
                     fetcher = OpenWeatherFetcher()
                     res = fetcher.fetch(lat, lon, self.prefs.tz)
@@ -983,6 +1168,7 @@ class MainWindow(QMainWindow):
                 pass
             def task():
                 try:
+                    from ..sources.firebase_station import FirebaseStationFetcher
                     fetcher = FirebaseStationFetcher(station_id="station_A")
                     res = fetcher.fetch(0.0, 0.0, self.prefs.tz)
                     return res
@@ -1037,6 +1223,19 @@ class MainWindow(QMainWindow):
         return w
 
     def _rebuild_fetchers(self):
+        key = (
+            self.prefs.enable_open_meteo,
+            self.prefs.enable_open_weather,
+            self.prefs.enable_simulator,
+            bool(getattr(self.prefs, "enable_firebase_station", False)),
+        )
+        # cờ nguồn không đổi: giữ nguyên fetcher + executor đang chạy
+        if key == getattr(self, "_fetcher_key", None):
+            return
+        self._fetcher_key = key
+        old = getattr(self, "aggregator", None)
+        if old is not None:
+            old.close()
         self.fetchers = []
         if self.prefs.enable_open_meteo:
             self.fetchers.append(OpenMeteoFetcher())
@@ -1044,8 +1243,12 @@ class MainWindow(QMainWindow):
             self.fetchers.append(OpenWeatherFetcher())
         if self.prefs.enable_simulator:
             self.fetchers.append(SimulatedFetcher())
+        self._station_keys = []
         if getattr(self.prefs, "enable_firebase_station", False):
-            self.fetchers.append(FirebaseStationFetcher(station_id="station_A"))
+            from ..sources.firebase_station import FirebaseStationFetcher
+            st = FirebaseStationFetcher(station_id="station_A")
+            self.fetchers.append(st)
+            self._station_keys.append(st.source)
         self.aggregator = WeatherAggregator(self.fetchers)
 
     def apply_theme(self):
@@ -1053,12 +1256,18 @@ class MainWindow(QMainWindow):
         if not app:
             return
         try:
-            from pathlib import Path
             qss_path = Path(__file__).with_name("styles.qss")
-            if self.prefs.theme == "dark" and qss_path.exists():
+            mtime = qss_path.stat().st_mtime if qss_path.exists() else None
+            key = (self.prefs.theme, mtime)
+            # setStyleSheet buộc repolish toàn bộ widget; chỉ làm khi theme
+            # hoặc file QSS thực sự đổi
+            if key == getattr(self, "_applied_theme_key", None):
+                return
+            if self.prefs.theme == "dark" and mtime is not None:
                 app.setStyleSheet(qss_path.read_text(encoding="utf-8"))
             else:
                 app.setStyleSheet("")
+            self._applied_theme_key = key
         except Exception:
             pass
 
@@ -1066,16 +1275,24 @@ class MainWindow(QMainWindow):
         app = QApplication.instance()
         if not app:
             return
+        scale = float(self.prefs.font_scale or 1.0)
+        # đổi font toàn app cũng relayout toàn bộ; bỏ qua khi hệ số không đổi
+        if scale == getattr(self, "_applied_font_scale", None):
+            return
         f = app.font()
-        base = float(self.prefs.font_scale or 1.0)
-        f.setPointSizeF(max(8.0, f.pointSizeF() * (base / 1.0)))
+        # cỡ gốc lấy đúng một lần: nhân từ baseline thay vì từ font hiện tại
+        # để các lần áp dụng sau không cộng dồn hệ số
+        base = getattr(self, "_base_point_size", None)
+        if base is None:
+            base = self._base_point_size = f.pointSizeF()
+        f.setPointSizeF(max(8.0, base * scale))
         app.setFont(f)
+        self._applied_font_scale = scale
 
     def _apply_view_mode(self):
+        # tab Cài đặt dựng trễ: trước khi checkbox tồn tại thì dùng prefs
         detailed = getattr(self, "cb_detailed", None)
-        if detailed is None:
-            return
-        on = detailed.isChecked()
+        on = bool(self.prefs.detailed_view) if detailed is None else detailed.isChecked()
         # Toggle some detailed widgets
         for lab in [self.lbl_consensus, self.lbl_trend]:
             lab.setVisible(on)
@@ -1104,24 +1321,16 @@ class MainWindow(QMainWindow):
             pass
 
     def _build_info_tab(self) -> QWidget:
-        import platform, sys
-        from importlib import metadata
-
         w = QWidget(); v = QVBoxLayout(w)
         txt = QTextEdit(); txt.setReadOnly(True)
-        def get_ver(pkg):
-            try:
-                return metadata.version(pkg)
-            except Exception:
-                return "-"
         info = []
         info.append("Sản phẩm: Flood Alert ML System")
-        info.append(f"Phiên bản: {get_ver('flood_alert_ml')}")
+        info.append(f"Phiên bản: {_pkg_version('flood_alert_ml')}")
         info.append(f"Python: {sys.version.split()[0]}")
-        info.append(f"Hệ điều hành: {platform.platform()}")
+        info.append(f"Hệ điều hành: {_platform_info()}")
         info.append("\nThư viện:")
         for lib in ["PyQt6", "requests", "numpy", "scikit-learn", "openpyxl"]:
-            info.append(f"- {lib}: {get_ver(lib)}")
+            info.append(f"- {lib}: {_pkg_version(lib)}")
         txt.setText("\n".join(info))
         v.addWidget(txt)
 
@@ -1135,10 +1344,6 @@ class MainWindow(QMainWindow):
         return w
 
     def _build_files_tab(self) -> QWidget:
-        import os
-        from pathlib import Path
-        import csv
-
         w = QWidget(); v = QVBoxLayout(w)
         v.addWidget(QLabel(f"Thư mục log: {LOG_DIR}"))
 
@@ -1165,29 +1370,56 @@ class MainWindow(QMainWindow):
             except Exception:
                 QDesktopServices.openUrl(QUrl.fromLocalFile(str(p)))
 
-        def refresh_table():
-            self.table.clear()
-            if not CSV_LOG_PATH.exists():
-                self.table.setRowCount(0); self.table.setColumnCount(0)
-                return
+        def fill_table(headers, data):
+            # gom toàn bộ setItem vào một lượt layout/paint duy nhất
+            hdr = self.table.horizontalHeader()
+            self.table.setSortingEnabled(False)
+            self.table.setUpdatesEnabled(False)
+            self.table.blockSignals(True)
+            hdr.setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
             try:
-                with CSV_LOG_PATH.open("r", encoding="utf-8", newline="") as f:
-                    reader = csv.reader(f)
-                    rows = []
-                    for i, row in enumerate(reader):
-                        rows.append(row)
-                        if i > 100:
-                            break
-                if not rows:
-                    return
-                headers = rows[0]
-                data = rows[1:]
                 self.table.setColumnCount(len(headers))
                 self.table.setHorizontalHeaderLabels(headers)
                 self.table.setRowCount(len(data))
                 for r, row in enumerate(data):
                     for c, val in enumerate(row):
                         self.table.setItem(r, c, QTableWidgetItem(val))
+            finally:
+                hdr.setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+                self.table.blockSignals(False)
+                self.table.setUpdatesEnabled(True)
+
+        def refresh_table():
+            self.table.clear()
+            if not CSV_LOG_PATH.exists():
+                self.table.setRowCount(0); self.table.setColumnCount(0)
+                return
+
+            # đọc + parse CSV trên worker thread, GUI chỉ nhận list thuần
+            def task():
+                # chỉ đọc đúng 1 hàng tiêu đề + 100 hàng xem trước
+                with CSV_LOG_PATH.open("r", encoding="utf-8", newline="") as f:
+                    reader = csv.reader(f)
+                    headers = next(reader, None)
+                    if not headers:
+                        return None
+                    return headers, list(islice(reader, 100))
+
+            def done(res):
+                try:
+                    if res:
+                        fill_table(*res)
+                except Exception:
+                    pass
+                try:
+                    self._pending_signals.remove(sig)
+                except Exception:
+                    pass
+
+            sig = self.tp.submit(task)
+            sig.success.connect(done)
+            try:
+                self._pending_signals.append(sig)
             except Exception:
                 pass
 
@@ -1217,9 +1449,8 @@ class MainWindow(QMainWindow):
                     self.show_toast("Chưa có file CSV để phân tích")
                     return
                 # đơn giản: lấy hàng cuối cùng và kết luận
-                import csv as _csv
                 with CSV_LOG_PATH.open("r", encoding="utf-8", newline="") as f:
-                    rows = list(_csv.DictReader(f))
+                    rows = list(csv.DictReader(f))
                 if not rows:
                     self.show_toast("CSV trống")
                     return
@@ -1248,6 +1479,7 @@ class MainWindow(QMainWindow):
                 self.show_toast(str(e))
         bt_report.clicked.connect(do_report)
 
-        # initial load
-        QTimer.singleShot(0, refresh_table)
+        # initial load: refresh_table đã đọc file trên worker thread nên gọi
+        # thẳng, không cần vòng event loop trung gian nữa
+        refresh_table()
         return w
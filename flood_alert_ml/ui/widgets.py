@@ -1,14 +1,20 @@
 from __future__ import annotations
 
-from PyQt6.QtCore import Qt, QTimer, pyqtSignal
-from PyQt6.QtGui import QColor, QFont
-from PyQt6.QtWidgets import QLabel, QWidget, QVBoxLayout, QHBoxLayout, QFrame
+import numpy as np
+from PyQt6.QtCore import Qt, QObject, QTimer, pyqtSignal
+from PyQt6.QtGui import QColor, QFont, QPalette
+from PyQt6.QtWidgets import QApplication, QLabel, QWidget, QVBoxLayout, QHBoxLayout, QFrame
 
 try:
     from PyQt6.QtWebEngineWidgets import QWebEngineView  # type: ignore
 except Exception:  # pragma: no cover
     QWebEngineView = None
 
+try:
+    from PyQt6.QtWebChannel import QWebChannel  # type: ignore
+except Exception:  # pragma: no cover
+    QWebChannel = None
+
 try:
     import pyqtgraph as pg  # type: ignore
 except Exception:  # pragma: no cover
@@ -16,22 +22,55 @@ except Exception:  # pragma: no cover
 
 
 class RiskBadge(QLabel):
+    # màu nền/chữ theo mức độ; QPalette dựng trễ một lần cho cả class
+    _SEV_COLORS = {
+        "low": ("#2e7d32", "#d6f5d6"),
+        "mid": ("#f9a825", "#3a2e1e"),
+        "high": ("#c62828", "#ffcccc"),
+    }
+    _PALETTES: dict = {}
+
     def __init__(self):
         super().__init__("LOW")
         self.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.setProperty("severity", "low")
         self.setMargin(4)
+        self.setAutoFillBackground(True)
+        self.setPalette(self._palette("low"))
+        self.risk_text = "LOW"
+
+    @classmethod
+    def _palette(cls, sev: str) -> QPalette:
+        pal = cls._PALETTES.get(sev)
+        if pal is None:
+            bg, fg = cls._SEV_COLORS[sev]
+            pal = QPalette()
+            pal.setColor(QPalette.ColorRole.Window, QColor(bg))
+            pal.setColor(QPalette.ColorRole.WindowText, QColor(fg))
+            cls._PALETTES[sev] = pal
+        return pal
 
     def set_risk(self, label: str):
+        if label == self.risk_text:
+            return
+        self.risk_text = label
         self.setText(label)
         sev = "low"
         if label.upper() == "HIGH":
             sev = "high"
         elif label.upper().startswith("MOD"):
             sev = "mid"
+        if sev == self.property("severity"):
+            return
         self.setProperty("severity", sev)
-        self.style().unpolish(self)
-        self.style().polish(self)
+        # đổi mức: hoán đổi palette dựng sẵn thay vì đánh giá lại QSS
+        self.setPalette(self._palette(sev))
+        app = QApplication.instance()
+        if app is not None and app.styleSheet():
+            # theme tối dùng rule RiskBadge[severity=...] trong styles.qss;
+            # khi đó vẫn phải repolish để rule mới ăn
+            self.style().unpolish(self)
+            self.style().polish(self)
 
 
 class StatCard(QFrame):
@@ -48,8 +87,16 @@ class StatCard(QFrame):
         v.addWidget(self.title)
         v.addWidget(self.value)
         v.addWidget(self.badge)
+        # plain-Python shadow of the displayed strings (snapshots read these
+        # instead of crossing into Qt via .text())
+        self.title_text = title
+        self.value_text = "0"
 
     def set_value(self, text: str):
+        # skip the repaint when the text did not change between ticks
+        if text == self.value_text:
+            return
+        self.value_text = text
         self.value.setText(text)
 
 
@@ -67,21 +114,16 @@ class Toast(QWidget):
         self.timer.start(timeout_ms)
 
 
-class MapWidget(QWidget):
-        def __init__(self, lat: float, lon: float, zoom: int = 12):
-                super().__init__()
-                v = QVBoxLayout(self)
-                if QWebEngineView is None:
-                        lbl = QLabel("Bản đồ không khả dụng (chưa cài Qt WebEngine).")
-                        v.addWidget(lbl)
-                        self.web = None
-                else:
-                        self.web = QWebEngineView()
-                        v.addWidget(self.web)
-                        self._load_leaflet(lat, lon, zoom)
+class PositionBridge(QObject):
+    """Cầu QWebChannel: đẩy toạ độ sang trang Leaflet dưới dạng signal đã
+    định kiểu thay vì dựng + parse chuỗi JavaScript cho mỗi lần cập nhật."""
 
-        def _leaflet_html(self, lat: float, lon: float, zoom: int) -> str:
-                return f"""
+    position_changed = pyqtSignal(float, float, int)
+
+
+class MapWidget(QWidget):
+        # khung HTML dựng sẵn một lần ở mức class; mỗi lần nạp chỉ .format toạ độ
+        _HTML_TEMPLATE = """
 <!DOCTYPE html>
 <html>
 <head>
@@ -92,6 +134,7 @@ class MapWidget(QWidget):
         html, body, #map {{ height: 100%; margin: 0; }}
     </style>
     <script src=\"https://unpkg.com/leaflet@1.9.4/dist/leaflet.js\"></script>
+    <script src=\"qrc:///qtwebchannel/qwebchannel.js\"></script>
     <script>
         let map, marker;
         function init() {{
@@ -101,6 +144,13 @@ class MapWidget(QWidget):
                 attribution: '&copy; OpenStreetMap contributors'
             }}).addTo(map);
             marker = L.marker([{lat:.6f}, {lon:.6f}]).addTo(map);
+            if (typeof QWebChannel !== 'undefined' && typeof qt !== 'undefined') {{
+                new QWebChannel(qt.webChannelTransport, function (ch) {{
+                    ch.objects.bridge.position_changed.connect(function (la, lo, z) {{
+                        setPos(la, lo, z);
+                    }});
+                }});
+            }}
         }}
         function setPos(lat, lon, zoom) {{
             map.setView([lat, lon], zoom);
@@ -116,22 +166,53 @@ class MapWidget(QWidget):
 </html>
 """
 
+        def __init__(self, lat: float, lon: float, zoom: int = 12):
+                super().__init__()
+                v = QVBoxLayout(self)
+                self._loaded = False
+                if QWebEngineView is None:
+                        lbl = QLabel("Bản đồ không khả dụng (chưa cài Qt WebEngine).")
+                        v.addWidget(lbl)
+                        self.web = None
+                else:
+                        self.web = QWebEngineView()
+                        self.web.loadFinished.connect(self._on_load_finished)
+                        self._bridge = None
+                        if QWebChannel is not None:
+                                self._bridge = PositionBridge()
+                                self._channel = QWebChannel(self.web)
+                                self._channel.registerObject("bridge", self._bridge)
+                                self.web.page().setWebChannel(self._channel)
+                        v.addWidget(self.web)
+                        self._load_leaflet(lat, lon, zoom)
+
+        def _on_load_finished(self, ok: bool):
+                self._loaded = bool(ok)
+
+        def _leaflet_html(self, lat: float, lon: float, zoom: int) -> str:
+                return self._HTML_TEMPLATE.format(lat=lat, lon=lon, zoom=zoom)
+
         def _load_leaflet(self, lat: float, lon: float, zoom: int):
                 if not self.web:
                         return
+                self._loaded = False
                 html = self._leaflet_html(lat, lon, zoom)
                 self.web.setHtml(html)
 
         def set_location(self, lat: float, lon: float, zoom: int = 12):
                 if not self.web:
                         return
-                # call JS function to move marker and center
-                js = f"setPos({lat:.6f}, {lon:.6f}, {zoom});"
-                try:
-                        self.web.page().runJavaScript(js)
-                except Exception:
-                        # if not ready yet, reload
+                if not self._loaded:
+                        # trang chưa sẵn sàng: nạp lại một lần duy nhất
                         self._load_leaflet(lat, lon, zoom)
+                        return
+                if self._bridge is not None:
+                        # một IPC với float đã định kiểu thay vì parse chuỗi JS
+                        self._bridge.position_changed.emit(lat, lon, zoom)
+                        return
+                # fallback khi thiếu QtWebChannel: gọi JS như trước
+                js = f"setPos({lat:.6f}, {lon:.6f}, {zoom});"
+                self.web.page().runJavaScript(js)
 
 
 class ChartWidget(QWidget):
@@ -148,15 +229,26 @@ class ChartWidget(QWidget):
                 self.bot = pg.PlotWidget(title="Xác suất (%)")
                 self.top.showGrid(x=True, y=True, alpha=0.3)
                 self.bot.showGrid(x=True, y=True, alpha=0.3)
+                # chuỗi dài: vẽ theo số pixel hiển thị thay vì theo số điểm
+                for p in (self.top, self.bot):
+                        p.setDownsampling(auto=True, mode='peak')
+                        p.setClipToView(True)
+                        p.setMouseEnabled(x=True, y=False)
                 v.addWidget(self.top)
                 v.addWidget(self.bot)
                 self.cur_precip = self.top.plot([], pen=pg.mkPen('#4ea1ff', width=2))
                 self.cur_prob = self.bot.plot([], pen=pg.mkPen('#ffa640', width=2))
+                # trục x dựng lại chỉ khi độ dài chuỗi thay đổi
+                self._xs_cache = np.empty(0, dtype=np.float32)
+
+        def _xs(self, n: int) -> np.ndarray:
+                if self._xs_cache.size != n:
+                        self._xs_cache = np.arange(n, dtype=np.float32)
+                return self._xs_cache
 
         def update_series(self, precip: list[float], probs: list[float]):
                 if self.top is None or self.bot is None:
                         return
-                xs = list(range(len(precip)))
-                self.cur_precip.setData(xs, precip)
-                xs2 = list(range(len(probs)))
-                self.cur_prob.setData(xs2, probs)
+                # mảng float32 liền mạch: pyqtgraph dùng trực tiếp, không copy list Python
+                self.cur_precip.setData(self._xs(len(precip)), np.asarray(precip, dtype=np.float32))
+                self.cur_prob.setData(self._xs(len(probs)), np.asarray(probs, dtype=np.float32))
@@ -1,83 +1,189 @@
 from __future__ import annotations
 
+import heapq
 import math
 import os
-import random
-import shutil
+import tempfile
+import threading
 import time
+import types
+from collections import OrderedDict
 from contextlib import contextmanager
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, Iterable, Optional
+from typing import Any, Dict, Iterable, Mapping, Optional
 
 import numpy as np
 
+from ._nb import median_std_nan
+
 
 def utc_now() -> datetime:
     return datetime.now(timezone.utc)
 
 
+def utc_now_ns() -> int:
+    # cho sổ sách nội bộ: một syscall trả int, không cấp phát datetime
+    return time.time_ns()
+
+
+def ns_to_iso(ns: int) -> str:
+    # chỉ dựng datetime ở biên I/O (ghi log, telemetry)
+    return datetime.fromtimestamp(ns / 1e9, tz=timezone.utc).isoformat()
+
+
 def clamp(v: Optional[float], lo: float, hi: float) -> Optional[float]:
     if v is None:
         return None
     return max(lo, min(hi, v))
 
 
+def clamp_arr(a: np.ndarray, lo: float, hi: float) -> np.ndarray:
+    # kẹp cả mảng bằng np.clip (SIMD), ghi tại chỗ — không cấp phát thêm
+    return np.clip(a, lo, hi, out=a)
+
+
+def _to_f64(values: Iterable[float]) -> np.ndarray:
+    # một lần copy C; None trở thành NaN và được kernel lọc cùng các NaN khác
+    return np.fromiter((math.nan if v is None else v for v in values), dtype=np.float64)
+
+
 def median_safe(values: Iterable[float]) -> Optional[float]:
-    vals = [v for v in values if v is not None and not math.isnan(v)]
-    if not vals:
+    med, _std, n = median_std_nan(_to_f64(values))
+    if n == 0:
         return None
-    return float(np.median(vals))
+    return float(med)
 
 
 def std_safe(values: Iterable[float]) -> float:
-    vals = [v for v in values if v is not None and not math.isnan(v)]
-    if len(vals) < 2:
+    _med, std, n = median_std_nan(_to_f64(values))
+    if n < 2:
         return 0.0
-    return float(np.std(vals))
+    return float(std)
 
 
-def backoff_delays(base: float = 0.5, factor: float = 2.0, attempts: int = 3, jitter: float = 0.2):
-    d = base
-    for _ in range(attempts):
-        yield max(0.0, random.uniform(d * (1 - jitter), d * (1 + jitter)))
-        d = min(d * factor, 30.0)
+def median_safe_batch(arrs_2d: np.ndarray) -> np.ndarray:
+    """Median từng hàng của ma trận (node × cửa_sổ) trong một lần gọi NumPy
+    thay vì lặp median_safe theo node; hàng toàn NaN cho ra NaN."""
+    a = np.asarray(arrs_2d, dtype=np.float64)
+    out = np.full(a.shape[0], np.nan)
+    ok = ~np.all(np.isnan(a), axis=1)
+    if ok.any():
+        out[ok] = np.nanmedian(a[ok], axis=1)
+    return out
+
+
+_TLS = threading.local()
+
+
+def _rng() -> np.random.Generator:
+    # mỗi worker thread một Generator riêng: không chia sẻ trạng thái RNG
+    # giữa các thread đang retry song song
+    r = getattr(_TLS, "rng", None)
+    if r is None:
+        r = _TLS.rng = np.random.default_rng()
+    return r
+
+
+def backoff_delays(base: float = 0.5, factor: float = 2.0, attempts: int = 3, jitter: float = 0.2) -> np.ndarray:
+    # cả lịch retry sinh trong một lần gọi RNG theo lô thay vì N lần
+    # random.uniform; vẫn lặp được như generator cũ
+    d = np.minimum(base * factor ** np.arange(attempts), 30.0)
+    return np.maximum(_rng().uniform(d * (1 - jitter), d * (1 + jitter)), 0.0)
 
 
 @contextmanager
 def atomic_write(path: Path):
-    tmp = path.with_suffix(path.suffix + ".tmp")
-    yield tmp
-    tmp.replace(path)
+    # file tạm nằm cùng thư mục để os.replace là rename trên cùng filesystem
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=path.name + ".", suffix=".tmp")
+    os.close(fd)
+    tmp = Path(tmp_name)
+    try:
+        yield tmp
+        # fsync trước khi rename: crash giữa ghi và đổi tên không mất dữ liệu
+        fd = os.open(tmp, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+        raise
+
+
+# mapping rỗng chia sẻ cho cache-miss: không cấp phát dict mới mỗi lần
+_EMPTY_HEADERS: Mapping[str, str] = types.MappingProxyType({})
 
 
 class ShortCache:
-    """Simple short-lived cache for HTTP responses (ETag/Last-Modified)"""
+    """Simple short-lived cache for HTTP responses (ETag/Last-Modified).
 
-    def __init__(self, ttl_s: int = 90):
-        self.ttl_s = ttl_s
-        self._store: Dict[str, Dict[str, Any]] = {}
+    ``get_headers`` returns a shared, read-only mapping — callers pass it
+    straight to ``requests`` and must not mutate it.
+    """
 
-    def get_headers(self, key: str) -> Dict[str, str]:
+    def __init__(self, ttl_s: int = 90, max_entries: int = 1024):
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        # TTL so sánh bằng int nanosecond trên đồng hồ monotonic: không bị
+        # vô hiệu nhầm khi đồng hồ hệ thống nhảy (NTP, chỉnh giờ tay)
+        self._ttl_ns = int(ttl_s * 1_000_000_000)
+        # OrderedDict giữ thứ tự chèn để cắt LRU; heap (hạn, key, ts) dọn
+        # entry hết hạn theo kiểu lười — phiên chạy dài không tích rác
+        self._store: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._expiry: list = []
+
+    def _evict_expired(self, now_ns: int) -> None:
+        heap = self._expiry
+        store = self._store
+        while heap and heap[0][0] <= now_ns:
+            _, key, ts = heapq.heappop(heap)
+            e = store.get(key)
+            # chỉ xoá khi ts khớp: key đã được update lại thì entry heap cũ
+            # trở thành mồ côi và bị bỏ qua
+            if e is not None and e["ts"] == ts:
+                del store[key]
+
+    def get_headers(self, key: str, now: Optional[int] = None) -> Mapping[str, str]:
+        # now (monotonic_ns) truyền từ ngoài khi duyệt nhiều key một lượt:
+        # lấy đồng hồ một lần cho cả lô
+        if now is None:
+            now = time.monotonic_ns()
+        self._evict_expired(now)
         e = self._store.get(key)
+        if e and now - e["ts"] < self._ttl_ns:
+            return e["headers"]
+        return _EMPTY_HEADERS
+
+    def update(self, key: str, response_headers: Dict[str, str], payload: Any, now: Optional[int] = None) -> None:
+        if now is None:
+            now = time.monotonic_ns()
+        self._evict_expired(now)
+        # dict header điều kiện dựng một lần ở đây; get_headers chỉ trả lại
         headers: Dict[str, str] = {}
-        if e and time.time() - e.get("ts", 0) < self.ttl_s:
-            if et := e.get("etag"):
-                headers["If-None-Match"] = et
-            if lm := e.get("last_modified"):
-                headers["If-Modified-Since"] = lm
-        return headers
-
-    def update(self, key: str, response_headers: Dict[str, str], payload: Any) -> None:
+        if et := response_headers.get("ETag") or response_headers.get("Etag"):
+            headers["If-None-Match"] = et
+        if lm := response_headers.get("Last-Modified"):
+            headers["If-Modified-Since"] = lm
         self._store[key] = {
-            "ts": time.time(),
-            "etag": response_headers.get("ETag") or response_headers.get("Etag"),
-            "last_modified": response_headers.get("Last-Modified"),
+            "ts": now,
+            "headers": headers or _EMPTY_HEADERS,
             "payload": payload,
         }
-
-    def get_cached_payload(self, key: str) -> Optional[Any]:
+        self._store.move_to_end(key)
+        heapq.heappush(self._expiry, (now + self._ttl_ns, key, now))
+        while len(self._store) > self.max_entries:
+            self._store.popitem(last=False)
+
+    def get_cached_payload(self, key: str, now: Optional[int] = None) -> Optional[Any]:
+        if now is None:
+            now = time.monotonic_ns()
+        self._evict_expired(now)
         e = self._store.get(key)
-        if e and time.time() - e.get("ts", 0) < self.ttl_s:
+        if e and now - e["ts"] < self._ttl_ns:
             return e.get("payload")
         return None
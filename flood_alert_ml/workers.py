@@ -1,18 +1,33 @@
 from __future__ import annotations
 
+import traceback
 from dataclasses import dataclass
 from typing import Any, Callable, Dict, List, Optional
 
 from PyQt6.QtCore import QObject, pyqtSignal, QRunnable, QThreadPool
 
 
+def format_error(exc: BaseException) -> str:
+    """Render an exception for display; called lazily by slots, not by the
+    worker thread that raised it."""
+    return "".join(traceback.format_exception_only(type(exc), exc)).strip()
+
+
 class WorkerSignals(QObject):
+    __slots__ = ()
+
     success = pyqtSignal(object)
-    error = pyqtSignal(str)
+    # phát nguyên exception; bên nhận mới format chuỗi (format_error) nên
+    # task lỗi mà không ai nghe thì không tốn công stringify
+    error = pyqtSignal(object)
     progress = pyqtSignal(float)
 
 
 class FuncRunnable(QRunnable):
+    # mỗi task một instance: bỏ __dict__ để tiết kiệm ~nửa bộ nhớ Python
+    # cho mỗi runnable khi fan-out lớn
+    __slots__ = ("fn", "args", "kwargs", "signals")
+
     def __init__(self, fn: Callable, *args, **kwargs):
         super().__init__()
         self.fn = fn
@@ -25,15 +40,60 @@ class FuncRunnable(QRunnable):
             res = self.fn(*self.args, **self.kwargs)
             self.signals.success.emit(res)
         except Exception as e:
-            self.signals.error.emit(str(e))
+            self.signals.error.emit(e)
+
+
+class BatchRunnable(QRunnable):
+    """Chạy fn trên cả lô đối số trong MỘT runnable: một cặp QObject/signal
+    cho cả lô thay vì mỗi phần tử một FuncRunnable."""
+
+    __slots__ = ("fn", "args_list", "signals")
+
+    def __init__(self, fn: Callable, args_list: List[tuple]):
+        super().__init__()
+        self.fn = fn
+        self.args_list = list(args_list)
+        self.signals = WorkerSignals()
+
+    def run(self):
+        results: List[Any] = []
+        n = len(self.args_list)
+        step = max(1, n // 100)  # progress thưa ~1%/lần để không spam signal
+        try:
+            for i, a in enumerate(self.args_list, 1):
+                results.append(self.fn(*a))
+                if i == n or i % step == 0:
+                    self.signals.progress.emit(i / n)
+            self.signals.success.emit(results)
+        except Exception as e:
+            self.signals.error.emit(e)
 
 
 class ThreadPool:
-    def __init__(self, max_workers: int = 8):
-        self.pool = QThreadPool.globalInstance()
-        self.pool.setMaxThreadCount(max_workers)
+    # các shard dùng chung cho cả process (như globalInstance trước đây)
+    # nhưng tách thành nhiều QThreadPool để hàng đợi + mutex không còn là
+    # một điểm tranh chấp duy nhất khi submit dồn dập
+    _pools: List[QThreadPool] = []
+
+    def __init__(self, max_workers: int = 8, shards: int = 2):
+        if not ThreadPool._pools:
+            shards = max(1, min(shards, max_workers))
+            per_shard = max(1, max_workers // shards)
+            for _ in range(shards):
+                p = QThreadPool()
+                p.setMaxThreadCount(per_shard)
+                ThreadPool._pools.append(p)
+        self.pools = ThreadPool._pools
 
     def submit(self, fn: Callable, *args, **kwargs) -> WorkerSignals:
         r = FuncRunnable(fn, *args, **kwargs)
-        self.pool.start(r)
+        # chọn shard đang rảnh nhất thay vì round-robin mù
+        pool = min(self.pools, key=lambda p: p.activeThreadCount())
+        pool.start(r)
+        return r.signals
+
+    def submit_batch(self, fn: Callable, args_list: List[tuple]) -> WorkerSignals:
+        r = BatchRunnable(fn, args_list)
+        pool = min(self.pools, key=lambda p: p.activeThreadCount())
+        pool.start(r)
         return r.signals